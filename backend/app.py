@@ -1,11 +1,21 @@
-from fastapi import FastAPI
+import os
+
+# The optimizer works on a 1-D problem; BLAS/OpenMP thread pools only add
+# contention there. Must be set before numpy/scipy are imported (via risk_feature).
+os.environ.setdefault("OMP_NUM_THREADS", "1")
+os.environ.setdefault("OPENBLAS_NUM_THREADS", "1")
+os.environ.setdefault("MKL_NUM_THREADS", "1")
+
+from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel, Field, conlist
+from pydantic import BaseModel, ConfigDict, Field, conlist
+from pydantic.dataclasses import dataclass
 from typing import Literal, List, Union, Annotated
-from uuid import uuid4
+from collections import deque
+from itertools import count
 import logging
 
-from risk_feature import compute_risk
+from risk_feature import compute_risk, compute_risk_batch
 
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
@@ -18,28 +28,38 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-class SingleShotQuestion(BaseModel):
+# Game payloads are immutable, __slots__-backed pydantic dataclasses that reject unknown keys:
+# no per-instance __dict__ and faster attribute access on every request
+game_model = dataclass(slots=True, frozen=True, config=ConfigDict(extra="forbid"))
+
+@game_model
+class SingleShotQuestion:
     game: Literal["single"]
     choice: Literal["safe", "risky"]
 
-class MultiShotQuestion(BaseModel):
+@game_model
+class MultiShotQuestion:
     game: Literal["multiple"]
-    choices: List[Literal["safe", "risky"]] = Field(..., min_items=4, max_items=4)
+    choices: Annotated[List[Literal["safe", "risky"]], Field(min_length=4, max_length=4)]
 
-class SliderQuestion(BaseModel):
+@game_model
+class SliderQuestion:
     game: Literal["slider"]
-    certainty: float = Field(..., ge=0, le=100)
+    certainty: Annotated[float, Field(ge=0, le=100)]
 
-class BalloonQuestion(BaseModel):
+@game_model
+class BalloonQuestion:
     game: Literal["balloon"]
-    pumps: int = Field(..., ge=0)
+    pumps: Annotated[int, Field(ge=0)]
     popped: bool
 
-class BudgetQuestion(BaseModel):
+@game_model
+class BudgetQuestion:
     game: Literal["budget"]
-    risky_tokens: int = Field(..., ge=0, le=100)
+    risky_tokens: Annotated[int, Field(ge=0, le=100)]
 
-class RiskGameQuestion(BaseModel):
+@game_model
+class RiskGameQuestion:
     game: Literal["risk"]
     choices: conlist(Literal["safe", "risky"], min_length=1, max_length=10)
 
@@ -55,26 +75,63 @@ AnyGame = Annotated[
     Field(discriminator="game"),
 ]
 
+# Upper bound on payloads per /game_data/batch request; larger batches are rejected with 422
+MAX_BATCH_SIZE = 1000
+GameBatch = Annotated[List[AnyGame], Field(max_length=MAX_BATCH_SIZE)]
+
+# Declared response models let FastAPI serialize results straight to JSON bytes with pydantic-core
+class RiskScoreResponse(BaseModel):
+    risk_score: float
 
-_data: list[dict] = []
+class BatchRiskScoreResponse(BaseModel):
+    risk_scores: List[float]
 
-@app.post("/game_data")
+
+# Most recent results only; older entries are evicted instead of growing without bound
+_data: deque[dict] = deque(maxlen=10_000)
+_id_seq = count(1)
+
+@app.post("/game_data", response_model=RiskScoreResponse)
 async def create_game(payload: AnyGame):
-    logger.info(f"Received payload: {payload}")
+    if logger.isEnabledFor(logging.INFO):
+        logger.info(f"Received payload: {payload}")
     try:
-        risk = compute_risk(payload.model_dump())
+        risk = compute_risk(payload)
         _data.append(
             {
-                "id": str(uuid4()),
+                "id": next(_id_seq),
                 "game": payload.game,
                 "risk": risk,
             }
         )
-        logger.info(f"Created game: {payload.game} with risk score: {risk}")
+        if logger.isEnabledFor(logging.INFO):
+            logger.info(f"Created game: {payload.game} with risk score: {risk}")
         return {"risk_score": risk}
     except ValueError as e:
         logger.error(f"ValueError in compute_risk: {e}")
         raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         logger.error(f"Unexpected error processing game data: {e}")
+        raise HTTPException(status_code=500, detail="Internal server error")
+
+@app.post("/game_data/batch", response_model=BatchRiskScoreResponse)
+async def create_games(payloads: GameBatch):
+    if logger.isEnabledFor(logging.INFO):
+        logger.info(f"Received batch of {len(payloads)} payloads")
+    try:
+        risks = compute_risk_batch(payloads)
+        _data.extend(
+            {
+                "id": next(_id_seq),
+                "game": payload.game,
+                "risk": risk,
+            }
+            for payload, risk in zip(payloads, risks)
+        )
+        return {"risk_scores": risks}
+    except ValueError as e:
+        logger.error(f"ValueError in compute_risk_batch: {e}")
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logger.error(f"Unexpected error processing batch game data: {e}")
         raise HTTPException(status_code=500, detail="Internal server error")
\ No newline at end of file
@@ -1,82 +1,279 @@
 from __future__ import annotations
 from typing import List, Dict, Literal, Tuple
+from functools import lru_cache
 import math
 import numpy as np
-from scipy.optimize import minimize
+from numba import njit
+from scipy.optimize import minimize_scalar
+from scipy.special import expit
 import logging
 
-logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
+# Resolution of the rho grid used to locate the global likelihood maximum
+RHO_GRID_SIZE = 4096
+
+@njit(cache=True, fastmath=True)
 def _crra_utility(x: float, rho: float) -> float:
     """
-    Constant-Relative-Risk-Aversion utility.
-      u(x) = x^(1-rho)/(1-rho)      if rho ≠ 1
-      u(x) = log(x)                 if rho = 1        (limit case)
+    Constant-Relative-Risk-Aversion utility, in the shifted form
+      u(x) = (x^(1-rho) - 1)/(1-rho) = expm1((1-rho)*log(x))/(1-rho)      if rho ≠ 1
+      u(x) = log(x)                                                     if rho = 1   (limit case)
+    The shift is constant in x, so utility differences between lotteries are
+    unchanged, but u is continuous in rho and free of cancellation near rho = 1.
+    """
+    log_x = math.log(max(x, 1e-9))
+    one_minus = 1.0 - rho
+    if abs(one_minus) < 1e-8:
+        return log_x
+    return math.expm1(one_minus * log_x) / one_minus
+
+@njit(cache=True, fastmath=True)
+def _sigmoid(x: float) -> float:
     """
-    if rho == 1.0:
-        return math.log(max(x, 1e-9))
-    return (max(x, 1e-9) ** (1.0 - rho)) / (1.0 - rho)
+    Branchless, numerically stable σ(x) = (1 + tanh(x/2)) / 2.
+    tanh saturates cleanly, so no argument range needs special-casing.
+    """
+    return 0.5 * (1.0 + math.tanh(0.5 * x))
+
+ScenarioKey = Tuple[Tuple[float, Tuple[Tuple[float, float], ...]], ...]
 
-def _expected_utility(lottery, rho: float) -> float:
+def _scenario_key(scenarios: List[Dict]) -> ScenarioKey:
     """
-    Accepts a list of either
+    Normalizes scenarios into a hashable ((safe_value, ((payoff, prob), ...)), ...) key.
+    Risky lotteries may be lists of either
       • (payoff, prob) tuples      OR
       • {'value': payoff, 'prob': p} dicts
     """
-    eu = 0.0
-    for item in lottery:
-        if isinstance(item, dict):
-            payoff = float(item["value"])
-            prob   = float(item.get("prob", 1.0 / len(lottery)))
-        else:
-            payoff, prob = item
-        eu += _crra_utility(payoff, rho) * prob
-    return eu
+    key = []
+    for sc in scenarios:
+        lottery = sc["risky_options"]
+        outcomes = []
+        for item in lottery:
+            if isinstance(item, dict):
+                payoff = float(item["value"])
+                prob   = float(item.get("prob", 1.0 / len(lottery)))
+            else:
+                payoff, prob = item
+            outcomes.append((float(payoff), float(prob)))
+        key.append((float(sc["safe_value"]), tuple(outcomes)))
+    return tuple(key)
 
-def _safe_sigmoid(x: float) -> float:
+ScenarioArrays = Tuple[np.ndarray, np.ndarray, np.ndarray, float, float]
+
+@lru_cache(maxsize=64)
+def _scenario_arrays(scenario_key: ScenarioKey) -> ScenarioArrays:
     """
-    Numerically stable σ(x).   Uses tanh for |x|>20 so we never call exp()
-    outside the safe range.
+    Flattens a scenario key into
+      (safe_vals[N], risky_vals[N, K], risky_probs[N, K], shared_val, shared_prob).
+    An outcome present in every lottery (e.g. the 50% chance of 0 in all game
+    scenarios) is factored out as (shared_val, shared_prob), so its utility is
+    computed once per rho instead of once per scenario; (1.0, 0.0) if none.
+    Shorter lotteries are padded with zero-probability payoffs of 1.0.
+    The arrays are shared between cache hits, so they are returned read-only.
     """
-    if x > 20:           # exp(-x) would underflow
-        return 1.0
-    if x < -20:          # exp(-x) would overflow
-        return 0.0
-    return 1.0 / (1.0 + math.exp(-x))
+    common = set(scenario_key[0][1])
+    for _, outcomes in scenario_key[1:]:
+        common &= set(outcomes)
+    shared_val, shared_prob = min(common) if common else (1.0, 0.0)
 
+    lotteries = []
+    for _, outcomes in scenario_key:
+        outcomes = list(outcomes)
+        if common:
+            outcomes.remove((shared_val, shared_prob))
+        lotteries.append(outcomes)
 
-def _choice_loglik(
+    n_outcomes = max(len(outcomes) for outcomes in lotteries)
+    safe_vals = np.empty(len(scenario_key), dtype=np.float64)
+    risky_vals = np.ones((len(scenario_key), n_outcomes), dtype=np.float64)
+    risky_probs = np.zeros((len(scenario_key), n_outcomes), dtype=np.float64)
+
+    for i, ((safe_value, _), outcomes) in enumerate(zip(scenario_key, lotteries)):
+        safe_vals[i] = safe_value
+        for j, (payoff, prob) in enumerate(outcomes):
+            risky_vals[i, j] = payoff
+            risky_probs[i, j] = prob
+
+    for arr in (safe_vals, risky_vals, risky_probs):
+        arr.setflags(write=False)
+    return safe_vals, risky_vals, risky_probs, shared_val, shared_prob
+
+
+@njit(cache=True, fastmath=True)
+def _eu_risky(
         rho: float,
-        choices: List[Literal["safe", "risky"]],
-        scenarios: List[Dict],
-        temperature: float,  # Temperature is now a required parameter
+        risky_vals: np.ndarray,
+        risky_probs: np.ndarray,
+        i: int,
+        eu_shared: float,
+) -> float:
+    """
+    Expected utility of scenario i's lottery, given the precomputed
+    probability-weighted utility of the shared outcome.
+    """
+    eu = eu_shared
+    for j in range(risky_vals.shape[1]):
+        eu += _crra_utility(risky_vals[i, j], rho) * risky_probs[i, j]
+    return eu
+
+
+@njit(cache=True, fastmath=True)
+def _loglik_numba(
+        rho: float,
+        safe_vals: np.ndarray,
+        risky_vals: np.ndarray,
+        risky_probs: np.ndarray,
+        shared_val: float,
+        shared_prob: float,
+        choice_mask: np.ndarray,
+        temperature: float,
 ) -> float:
+    """
+    Compiled kernel behind `_choice_loglik`: returns -LL.
+    """
+    epsilon = 1e-9
     ll = 0.0
+    eu_shared = _crra_utility(shared_val, rho) * shared_prob
+
+    for i in range(safe_vals.shape[0]):
+        eu_risky = _eu_risky(rho, risky_vals, risky_probs, i, eu_shared)
+        delta = (eu_risky - _crra_utility(safe_vals[i], rho)) / temperature
+        p_risky = _sigmoid(delta)
+
+        if choice_mask[i] == 1:
+            prob_chosen = p_risky
+        else:
+            prob_chosen = 1.0 - p_risky
+
+        ll += math.log(max(prob_chosen, epsilon))
+
+    return -ll
+
+
+@njit(cache=True, fastmath=True)
+def _log_prob_tables(
+        rho_grid: np.ndarray,
+        safe_vals: np.ndarray,
+        risky_vals: np.ndarray,
+        risky_probs: np.ndarray,
+        shared_val: float,
+        shared_prob: float,
+        temperature: float,
+) -> np.ndarray:
+    """
+    Compiled kernel behind `_rho_grid_tables`: log P(safe) and log P(risky)
+    for every (grid rho, scenario) pair, floored at epsilon like `_loglik_numba`.
+    """
     epsilon = 1e-9
+    n_grid = rho_grid.shape[0]
+    n_scenarios = safe_vals.shape[0]
+    log_p = np.empty((n_grid, n_scenarios, 2))
+
+    for k in range(n_grid):
+        rho = rho_grid[k]
+        eu_shared = _crra_utility(shared_val, rho) * shared_prob
+        for i in range(n_scenarios):
+            eu_risky = _eu_risky(rho, risky_vals, risky_probs, i, eu_shared)
+            p_risky = _sigmoid((eu_risky - _crra_utility(safe_vals[i], rho)) / temperature)
+            log_p[k, i, 0] = math.log(max(1.0 - p_risky, epsilon))
+            log_p[k, i, 1] = math.log(max(p_risky, epsilon))
+
+    return log_p
+
 
+def _clamp_temperature(temperature: float) -> float:
     # Ensure temperature is positive and reasonably sized
     if temperature <= 1e-6:
         # logger.warning(f"Temperature ({temperature}) is too small or non-positive. Clamping to 1e-6.")
-        current_temp = 1e-6
-    else:
-        current_temp = temperature
+        return 1e-6
+    return temperature
 
-    for ch, sc in zip(choices, scenarios):
-        eu_safe = _crra_utility(sc["safe_value"], rho)
-        eu_risky = _expected_utility(sc["risky_options"], rho)
 
-        delta = (eu_risky - eu_safe) / current_temp
-        p_risky = _safe_sigmoid(delta)
+def _choice_loglik(
+        rho: float,
+        safe_vals: np.ndarray,
+        risky_vals: np.ndarray,
+        risky_probs: np.ndarray,
+        shared_val: float,
+        shared_prob: float,
+        choice_mask: np.ndarray,
+        temperature: float,  # Temperature is now a required parameter
+) -> float:
+    """
+    Negative log-likelihood of the observed choices, over the arrays
+    returned by `_scenario_arrays`.
+    choice_mask is a uint8 array: 1 where "risky" was chosen and 0 for "safe".
+    """
+    return _loglik_numba(
+        float(rho), safe_vals, risky_vals, risky_probs, shared_val, shared_prob,
+        choice_mask, _clamp_temperature(temperature)
+    )
 
-        if ch == "risky":
-            prob_chosen = p_risky
-        else:  # ch == "safe"
-            prob_chosen = 1.0 - p_risky
 
-        ll += math.log(max(prob_chosen, epsilon))
+@lru_cache(maxsize=64)
+def _rho_grid_tables(
+        scenario_key: ScenarioKey,
+        rho_bounds: Tuple[float, float],
+        temperature: float,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Returns (rho_grid[K], log_p[K, N, 2]) over RHO_GRID_SIZE evenly spaced rho
+    values, where log_p[..., 0] is log P(safe) and log_p[..., 1] is log P(risky).
+    Built once per scenario set, after which the log-likelihood of any choice
+    pattern over the whole grid is a single gather indexed by its 0/1 choice mask.
+    """
+    rho_grid = np.linspace(rho_bounds[0], rho_bounds[1], RHO_GRID_SIZE)
+    log_p = _log_prob_tables(
+        rho_grid, *_scenario_arrays(scenario_key), _clamp_temperature(temperature)
+    )
+    for arr in (rho_grid, log_p):
+        arr.setflags(write=False)
+    return rho_grid, log_p
 
-    return -ll
+
+@lru_cache(maxsize=4096)
+def _estimate_rho(
+        choices: Tuple[str, ...],
+        scenario_key: ScenarioKey,
+        rho_bounds: Tuple[float, float],
+        temperature: float,
+) -> float:
+    """
+    Maximum-likelihood rho for one choice pattern. Memoized: the choice space
+    of a fixed scenario set is small, so repeated patterns skip the optimizer.
+
+    The global minimum is located on the precomputed rho grid, which serves as
+    the warm start: an optimum on a bound is returned as-is, an interior one is
+    polished within the neighbouring grid cells by bounded Brent on the exact objective.
+    """
+    choice_mask = np.frombuffer(bytes(1 if ch == "risky" else 0 for ch in choices), dtype=np.uint8)
+
+    rho_grid, log_p = _rho_grid_tables(scenario_key, rho_bounds, temperature)
+    grid_nll = -log_p[:, np.arange(len(choice_mask)), choice_mask].sum(axis=1)
+    # Saturated patterns leave a flat optimum; resolve ties to the most extreme rho (the limiting MLE)
+    ties = np.flatnonzero(grid_nll <= grid_nll.min() + 1e-9)
+    k = int(ties[np.argmax(np.abs(rho_grid[ties]))])
+    if k == 0 or k == len(rho_grid) - 1:
+        # The likelihood keeps improving towards the bound: the warm start is already the answer
+        return float(rho_grid[k])
+    bracket = (float(rho_grid[k - 1]), float(rho_grid[k + 1]))
+
+    # Precompute contiguous float64 arrays once; the compiled objective never touches Python objects
+    arrays = _scenario_arrays(scenario_key)
+
+    res = minimize_scalar(
+        lambda r: _choice_loglik(r, *arrays, choice_mask, temperature=temperature),
+        bounds=bracket,
+        method="bounded",
+        options={"xatol": 1e-5},
+    )
+
+    if not res.success:
+        logger.warning(
+            f"Optimization for rho_hat did not succeed: {res.message}. Using result x: {res.x:.4f} (status: {res.status})")
+
+    return float(res.x)
 
 
 def arrow_pratt_from_choices(
@@ -84,7 +281,6 @@ def arrow_pratt_from_choices(
         scenarios: List[Dict],
         wealth_base: float | None = None,
         rho_bounds: Tuple[float, float] = (-4.0, 4.0),  # MODIFIED: Wider default bounds
-        initial_rho: float = 0.0,  # MODIFIED: Default initial rho to 0 (neutral)
         temperature: float = 1.0  # ADDED: Temperature parameter
 ) -> Tuple[float, float]:
     """
@@ -98,20 +294,12 @@ def arrow_pratt_from_choices(
         # Log error or return a default if appropriate for your application upon failure
         raise ValueError("Choices and scenarios length mismatch or choices list is empty.")
 
-    logger.info(f"Estimating rho with {len(choices)} choices, temperature: {temperature}, initial_rho: {initial_rho}, bounds: {rho_bounds}")
+    if logger.isEnabledFor(logging.INFO):
+        logger.info(f"Estimating rho with {len(choices)} choices, temperature: {temperature}, bounds: {rho_bounds}")
 
-    res = minimize(
-        lambda r_arr: _choice_loglik(r_arr[0], choices, scenarios, temperature=temperature),
-        x0=[initial_rho],
-        bounds=[rho_bounds],  # Pass as a list containing one tuple for the single variable
-        method="L-BFGS-B",
+    rho_hat = _estimate_rho(
+        tuple(choices), _scenario_key(scenarios), tuple(rho_bounds), temperature
     )
-
-    if not res.success:
-        logger.warning(
-            f"Optimization for rho_hat did not succeed: {res.message}. Using result x: {res.x[0]:.4f} (status: {res.status})")
-
-    rho_hat = float(res.x[0])
     # Clip rho_hat to bounds just in case optimizer slightly oversteps due to numerical precision
     rho_hat = max(rho_bounds[0], min(rho_hat, rho_bounds[1]))
 
@@ -140,7 +328,6 @@ def risk_index_from_choices(
     scenarios: List[Dict],
     wealth_base: float | None = None,
     rho_bounds_for_estimation: Tuple[float, float] = (-4.0, 4.0), # Allow configuring estimation bounds
-    initial_rho_for_estimation: float = 0.0,
     temperature_for_estimation: float = 1.0 # Allow configuring temperature
 ) -> float:
     """
@@ -162,7 +349,6 @@ def risk_index_from_choices(
             scenarios,
             wealth_base,
             rho_bounds=rho_bounds_for_estimation,
-            initial_rho=initial_rho_for_estimation,
             temperature=temperature_for_estimation # Pass temperature
         )
     except ValueError as e:
@@ -172,10 +358,10 @@ def risk_index_from_choices(
         logger.error(f"Unexpected error during rho estimation: {e}. Returning neutral index 0.5.")
         return 0.5
 
-    logger.info(f"Estimated rho_hat for index calculation: {rho_hat:.4f}")
-
     # Transformation: sigmoid(-rho_hat) which is 1 / (1 + exp(rho_hat))
-    risk_index = 1.0 / (1.0 + math.exp(rho_hat))
+    risk_index = float(expit(-rho_hat))
 
-    logger.info(f"Calculated risk_index: {risk_index:.4f}")
+    if logger.isEnabledFor(logging.INFO):
+        logger.info(f"Estimated rho_hat for index calculation: {rho_hat:.4f}")
+        logger.info(f"Calculated risk_index: {risk_index:.4f}")
     return risk_index
\ No newline at end of file
@@ -1,9 +1,10 @@
 from __future__ import annotations
-from typing import Dict, List, Literal
+from typing import Any, Callable, Dict, List, Literal, Tuple
+from functools import lru_cache
+import numpy as np
 from arrow_pratt import risk_index_from_choices
 import logging
 
-logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
 
@@ -26,14 +27,86 @@ def calculate_expected_value(options: List[Dict[str, float]]) -> float:
         expected_value += option["prob"] * option["value"]
     return expected_value
 
+@lru_cache(maxsize=4096)
+def _risk_index_cached(choices: Tuple[str, ...], temperature: float) -> float:
+    # GAME_SCENARIOS_PROPERTIES is a module constant, so (choices, temperature) fully determines the index
+    return risk_index_from_choices(
+        list(choices),
+        GAME_SCENARIOS_PROPERTIES,
+        temperature_for_estimation=temperature
+    )
+
 def calculate_risk_game_score_with_prat(
         choices: List[Literal["safe", "risky"]],
-        scenario_properties: List[Dict[str, any]]
+        scenario_properties: List[Dict[str, any]],
+        temperature: float = 1.0
 ) -> float:
-    return risk_index_from_choices(choices, scenario_properties)
+    if scenario_properties is GAME_SCENARIOS_PROPERTIES:
+        return _risk_index_cached(tuple(choices), temperature)
+    return risk_index_from_choices(
+        choices,
+        scenario_properties,
+        temperature_for_estimation=temperature
+    )
 
 
 
+def _round_score_arrays(scenario_properties: List[Dict[str, any]]) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Per-scenario round scores for choosing risky and for choosing safe.
+    They depend only on the scenarios, so they can be computed ahead of any choices.
+    """
+    safe_ev = np.array([scenario["safe_value"] for scenario in scenario_properties], dtype=np.float64)
+    risky_ev = np.array(
+        [calculate_expected_value(scenario["risky_options"]) for scenario in scenario_properties],
+        dtype=np.float64
+    )
+    certainty_equivalent = risky_ev - safe_ev
+
+    # Chose risky: rational (EV_risky >= EV_safe) scores slightly above neutral, more if the
+    # premium is large; against the EVs it is clear risk-seeking
+    risky_scores = np.where(
+        certainty_equivalent >= 0,
+        0.6 + 0.4 * np.clip(certainty_equivalent / (safe_ev + 1e-9), 0, 1),
+        1.0
+    )
+    # Chose safe: giving up a positive EV premium is clear risk-aversion, scored lower the
+    # larger the premium foregone; otherwise it was rational (EV_safe >= EV_risky)
+    safe_scores = np.where(
+        certainty_equivalent >= 0,
+        0.4 - 0.4 * np.clip(certainty_equivalent / (risky_ev + 1e-9), 0, 1),
+        0.2
+    )
+    return np.clip(risky_scores, 0.0, 1.0), np.clip(safe_scores, 0.0, 1.0)
+
+_RISKY_ROUND_SCORES, _SAFE_ROUND_SCORES = _round_score_arrays(GAME_SCENARIOS_PROPERTIES)
+
+def _aversion_round_scores(
+        choices_batch: List[List[Literal["safe", "risky"]]],
+        scenario_properties: List[Dict[str, any]],
+        payload_indices: List[int] | None = None
+) -> np.ndarray:
+    """
+    (B, N) round scores for a non-empty batch of choice lists, shared by the single and batch scorers.
+    A mismatched row raises ValueError, prefixed with "payload {index}: " when payload_indices is given.
+    """
+    for position, choices in enumerate(choices_batch):
+        if not choices or len(choices) != len(scenario_properties):
+            message = "Mismatch between choices and scenario definitions"
+            if payload_indices is not None:
+                message = f"payload {payload_indices[position]}: {message}"
+            raise ValueError(message)
+            # todo :: compare this returns and exception::  return 0.5 neutral score
+
+    if scenario_properties is GAME_SCENARIOS_PROPERTIES:
+        risky_scores, safe_scores = _RISKY_ROUND_SCORES, _SAFE_ROUND_SCORES
+    else:
+        risky_scores, safe_scores = _round_score_arrays(scenario_properties)
+
+    chose_risky = np.array([[c == "risky" for c in choices] for choices in choices_batch], dtype=bool)
+    chose_safe = np.array([[c == "safe" for c in choices] for choices in choices_batch], dtype=bool)
+    return np.where(chose_risky, risky_scores, np.where(chose_safe, safe_scores, 0.5))
+
 def calculate_risk_game_score_with_aversion_formula(
         choices: List[Literal["safe", "risky"]],
         scenario_properties: List[Dict[str, any]]
@@ -41,45 +114,24 @@ def calculate_risk_game_score_with_aversion_formula(
     """
     Calculates a risk score (0=more cautious/averse, 1=more bold/seeking) based on choices relative to expected values.
     """
-    if not choices or len(choices) != len(scenario_properties):
-        raise ValueError("Mismatch between choices and scenario definitions")
-        # todo :: compare this returns and exception::  return 0.5 neutral score
-
-    round_scores: List[float] = []
-
-    for index, choice_made in enumerate(choices):
-        scenario = scenario_properties[index]
-        safe_expected_value = scenario["safe_value"]
-        risky_expected_value = calculate_expected_value(scenario["risky_options"])
-
-        certainty_equivalent = risky_expected_value - safe_expected_value
-        round_score = 0.5
-
-        if choice_made == "risky":
-            if certainty_equivalent >= 0:
-                # Chose risky, and it was rational (EV_risky >= EV_safe)
-                # Score increases slightly above neutral, more if premium is large
-                round_score = 0.6 + 0.4 * min(1, max(0, certainty_equivalent / (safe_expected_value + 1e-9)))
-            else:
-                # Chose risky even though EV_risky < EV_safe (clear risk-seeking)
-                round_score = 1.0
-        elif choice_made == "safe":
-            if certainty_equivalent >= 0:
-                # Chose safe even though EV_risky > EV_safe (clear risk-aversion)
-                # They gave up `certainty_equivalent_premium_for_risky` in EV.
-                # Score decreases from neutral, more if premium foregone is large.
-                round_score = 0.4 - 0.4 * min(1, max(0, certainty_equivalent / (risky_expected_value + 1e-9)))
-            else:
-                # Chose safe, and it was rational (EV_safe >= EV_risky)
-                round_score = 0.2
-
-        round_scores.append(max(0.0, min(1.0, round_score)))
-
-    if not round_scores:
-        return 0.5
-
-    final_score = sum(round_scores) / len(round_scores)
-    return final_score
+    return float(_aversion_round_scores([choices], scenario_properties).mean())
+
+def calculate_risk_game_scores_with_aversion_formula_batch(
+        choices_batch: List[List[Literal["safe", "risky"]]],
+        scenario_properties: List[Dict[str, any]],
+        payload_indices: List[int] | None = None
+) -> List[float]:
+    """
+    Vectorized `calculate_risk_game_score_with_aversion_formula` over many players:
+    the choices are stacked into a (B, N) matrix and scored in one NumPy pass.
+    payload_indices labels each row in error messages (defaults to its position).
+    """
+    if not choices_batch:
+        return []
+    if payload_indices is None:
+        payload_indices = list(range(len(choices_batch)))
+
+    return _aversion_round_scores(choices_batch, scenario_properties, payload_indices).mean(axis=1).tolist()
 
 def single_shot(choice: str) -> float:
     return 1.0 if choice == "risky" else 0.0
@@ -107,28 +159,58 @@ def budget_split(risky_tokens: int,
                  total: int = 100) -> float:
     return risky_tokens / total
 
-def compute_risk(request_payload: Dict) -> float:
-    game_type = request_payload["game"]
-    logger.info(f"Game type: {game_type}")
-
-    if game_type == "single":
-        return single_shot(request_payload["choice"])
-    if game_type == "multiple":
-        return multi_shot_logic(request_payload["choices"])
-    if game_type == "slider":
-        return slider_question(request_payload["certainty"])
-    if game_type == "balloon":
-        return balloon_question(request_payload["pumps"], request_payload["popped"])
-    if game_type == "budget":
-        return budget_split(request_payload["risky_tokens"])
-    if game_type == "risk":
-        # return calculate_risk_game_score_with_prat(
-        #     request_payload["choices"],
-        #     GAME_SCENARIOS_PROPERTIES
-        # )
-        return calculate_risk_game_score_with_aversion_formula(
-            request_payload["choices"],
-            GAME_SCENARIOS_PROPERTIES
-        )
-
-    raise ValueError(f"Unknown game type: {game_type}")
\ No newline at end of file
+# Handlers read the validated game model's attributes directly (no model_dump() round-trip)
+_DISPATCH: Dict[str, Callable[[Any], float]] = {
+    "single": lambda p: single_shot(p.choice),
+    "multiple": lambda p: multi_shot_logic(p.choices),
+    "slider": lambda p: slider_question(p.certainty),
+    "balloon": lambda p: balloon_question(p.pumps, p.popped),
+    "budget": lambda p: budget_split(p.risky_tokens),
+    # "risk": lambda p: calculate_risk_game_score_with_prat(p.choices, GAME_SCENARIOS_PROPERTIES),
+    "risk": lambda p: calculate_risk_game_score_with_aversion_formula(p.choices, GAME_SCENARIOS_PROPERTIES),
+}
+
+def compute_risk(payload: Any) -> float:
+    game_type = payload.game
+    if logger.isEnabledFor(logging.INFO):
+        logger.info(f"Game type: {game_type}")
+
+    try:
+        handler = _DISPATCH[game_type]
+    except KeyError:
+        raise ValueError(f"Unknown game type: {game_type}") from None
+    return handler(payload)
+
+
+# Game types whose scoring is vectorized across a whole batch of payloads
+# Each handler gets the grouped payloads and their indices in the original batch
+_BATCH_DISPATCH: Dict[str, Callable[[List[Any], List[int]], List[float]]] = {
+    "risk": lambda ps, indices: calculate_risk_game_scores_with_aversion_formula_batch(
+        [p.choices for p in ps], GAME_SCENARIOS_PROPERTIES, indices
+    ),
+}
+
+def compute_risk_batch(payloads: List[Any]) -> List[float]:
+    """
+    Scores many payloads at once, returning the risk scores in input order.
+    Game types in _BATCH_DISPATCH are scored together; the rest go through compute_risk.
+    A ValueError names the offending payload by its index in the batch.
+    """
+    scores: List[float] = [0.0] * len(payloads)
+    grouped: Dict[str, List[int]] = {}
+
+    for index, payload in enumerate(payloads):
+        if payload.game in _BATCH_DISPATCH:
+            grouped.setdefault(payload.game, []).append(index)
+        else:
+            try:
+                scores[index] = compute_risk(payload)
+            except ValueError as e:
+                raise ValueError(f"payload {index}: {e}") from e
+
+    for game_type, indices in grouped.items():
+        batch_scores = _BATCH_DISPATCH[game_type]([payloads[i] for i in indices], indices)
+        for index, score in zip(indices, batch_scores):
+            scores[index] = score
+
+    return scores
\ No newline at end of file